@@ -10,6 +10,8 @@ __version__ = "1.0.2"
 
 from gd.rpc.config import DEFAULT_CONFIG, Config, ConfigData, get_config, get_default_config
 from gd.rpc.main import rpc
+from gd.rpc.runtime import DEFAULT_EVENT_LOOP, UVLOOP, RichPresenceRuntime, new_event_loop
+from gd.rpc.snapshot import Snapshot, SnapshotMode, SnapshotReader, SnapshotWriter
 
 __all__ = (
     # config
@@ -20,4 +22,14 @@ __all__ = (
     "get_default_config",
     # main
     "rpc",
+    # runtime
+    "DEFAULT_EVENT_LOOP",
+    "UVLOOP",
+    "RichPresenceRuntime",
+    "new_event_loop",
+    # snapshot
+    "Snapshot",
+    "SnapshotMode",
+    "SnapshotReader",
+    "SnapshotWriter",
 )
@@ -1,8 +1,8 @@
 from builtins import getattr as get_attribute
 from pathlib import Path
-from typing import Any, Optional, Type, TypeVar, cast
+from typing import Any, Callable, Dict, Optional, Tuple, Type, TypeVar, cast
 
-from attrs import define
+from attrs import define, field
 from gd.constants import DEFAULT_ENCODING, DEFAULT_ERRORS
 from gd.enums import Difficulty, LevelType, Scene
 from gd.string_utils import case_fold, tick
@@ -162,6 +162,187 @@ class ModeConfig:
     """The name of the *practice* mode."""
 
 
+LO = TypeVar("LO", bound="LevelOverrideConfig")
+
+
+@define()
+class LevelOverrideConfig:
+    """Represents the partial configuration of the RPC that overrides the level one.
+
+    Any values that are not specified are taken from the overridden configuration.
+    """
+
+    details: Optional[str] = None
+    """The `details` of the RPC."""
+    state: Optional[str] = None
+    """The `state` of the RPC."""
+
+    small: Optional[str] = None
+    """The `small` of the RPC."""
+
+    progress_precision: Optional[int] = None
+    """The record precision to use."""
+
+    @classmethod
+    def from_data(cls: Type[LO], override_data: AnyConfigData) -> LO:
+        return cls(
+            details=override_data.get(DETAILS),
+            state=override_data.get(STATE),
+            small=override_data.get(SMALL),
+            progress_precision=override_data.get(PROGRESS_PRECISION),
+        )
+
+    def apply(self, level: LevelConfig) -> LevelConfig:
+        """Applies the override to the `level` configuration.
+
+        Arguments:
+            level: The level configuration to override.
+
+        Returns:
+            The overridden level configuration.
+        """
+        details = self.details
+        state = self.state
+        small = self.small
+        progress_precision = self.progress_precision
+
+        return LevelConfig(
+            details=level.details if details is None else details,
+            state=level.state if state is None else state,
+            small=level.small if small is None else small,
+            progress_precision=(
+                level.progress_precision if progress_precision is None else progress_precision
+            ),
+        )
+
+
+DETAILS = "details"
+STATE = "state"
+SMALL = "small"
+PROGRESS_PRECISION = "progress_precision"
+
+DIFFICULTIES = {case_fold(difficulty.name): difficulty for difficulty in Difficulty}
+LEVEL_TYPES = {case_fold(level_type.name): level_type for level_type in LevelType}
+
+
+def parse_level_id(string: str) -> Optional[int]:
+    try:
+        return int(string)
+
+    except ValueError:
+        return None
+
+
+def parse_creator_name(string: str) -> Optional[str]:
+    return case_fold(string)
+
+
+def parse_difficulty(string: str) -> Optional[Difficulty]:
+    return DIFFICULTIES.get(case_fold(string))
+
+
+def parse_level_type(string: str) -> Optional[LevelType]:
+    return LEVEL_TYPES.get(case_fold(string))
+
+
+def is_table(data: Any) -> bool:
+    return isinstance(data, ConfigData)
+
+
+K = TypeVar("K")
+
+
+def parse_overrides(
+    data: AnyConfigData, parse_key: Callable[[str], Optional[K]]
+) -> Dict[K, LevelOverrideConfig]:
+    overrides: Dict[K, LevelOverrideConfig] = {}
+
+    if not is_table(data):  # ignore invalid overrides
+        return overrides
+
+    for string, override_data in data.items():
+        key = parse_key(string)
+
+        if key is None or not is_table(override_data):  # ignore invalid keys and overrides
+            continue
+
+        overrides[key] = LevelOverrideConfig.from_data(override_data)
+
+    return overrides
+
+
+O = TypeVar("O", bound="OverrideConfig")
+
+
+@define()
+class OverrideConfig:
+    """The configuration overrides to use for specific levels.
+
+    Overrides are indexed by level ID, creator name, difficulty and level type,
+    and are applied in the reverse order, so that level ID ones take precedence
+    over creator name ones, which take precedence over difficulty ones, and so on.
+    """
+
+    level_id: Dict[int, LevelOverrideConfig] = field(factory=dict)
+    """The overrides by level ID."""
+    creator_name: Dict[str, LevelOverrideConfig] = field(factory=dict)
+    """The overrides by (case-folded) creator name."""
+    difficulty: Dict[Difficulty, LevelOverrideConfig] = field(factory=dict)
+    """The overrides by level difficulty."""
+    level_type: Dict[LevelType, LevelOverrideConfig] = field(factory=dict)
+    """The overrides by level type."""
+
+    @classmethod
+    def from_data(cls: Type[O], override_data: AnyConfigData) -> O:
+        if not is_table(override_data):  # ignore invalid overrides
+            return cls()
+
+        level_id_data = override_data.level_id.unwrap_or_else(AnyConfigData)
+        creator_name_data = override_data.creator_name.unwrap_or_else(AnyConfigData)
+        difficulty_data = override_data.difficulty.unwrap_or_else(AnyConfigData)
+        level_type_data = override_data.level_type.unwrap_or_else(AnyConfigData)
+
+        return cls(
+            level_id=parse_overrides(level_id_data, parse_level_id),
+            creator_name=parse_overrides(creator_name_data, parse_creator_name),
+            difficulty=parse_overrides(difficulty_data, parse_difficulty),
+            level_type=parse_overrides(level_type_data, parse_level_type),
+        )
+
+    def apply(
+        self,
+        level: LevelConfig,
+        level_id: int,
+        creator_name: str,
+        difficulty: Difficulty,
+        level_type: LevelType,
+    ) -> LevelConfig:
+        """Applies the matching overrides to the `level` configuration.
+
+        Arguments:
+            level: The level configuration to override.
+            level_id: The ID of the level.
+            creator_name: The name of the level creator.
+            difficulty: The difficulty of the level.
+            level_type: The type of the level.
+
+        Returns:
+            The overridden level configuration.
+        """
+        overrides = (
+            self.level_type.get(level_type),
+            self.difficulty.get(difficulty),
+            self.creator_name.get(case_fold(creator_name)),
+            self.level_id.get(level_id),
+        )
+
+        for override in overrides:
+            if override is not None:
+                level = override.apply(level)
+
+        return level
+
+
 EXPECTED = "expected {}"
 
 
@@ -173,6 +354,8 @@ EXPECTED_RPC = expected("rpc")
 EXPECTED_RPC_PROCESS_NAME = expected("rpc.process_name")
 EXPECTED_RPC_REFRESH_SECONDS = expected("rpc.refresh_seconds")
 EXPECTED_RPC_CLIENT_ID = expected("rpc.client_id")
+EXPECTED_RPC_EVENT_LOOP = expected("rpc.event_loop")
+EXPECTED_RPC_SNAPSHOT = expected("rpc.snapshot")
 EXPECTED_RPC_EDITOR = expected("rpc.editor")
 EXPECTED_RPC_EDITOR_DETAILS = expected("rpc.editor.details")
 EXPECTED_RPC_EDITOR_STATE = expected("rpc.editor.state")
@@ -215,6 +398,8 @@ EXPECTED_RPC_MODE_NORMAL = expected("rpc.mode.normal")
 EXPECTED_RPC_MODE_PRACTICE = expected("rpc.mode.practice")
 
 
+LevelKey = Tuple[int, str, Difficulty, LevelType]
+
 C = TypeVar("C", bound="Config")
 
 
@@ -228,6 +413,10 @@ class Config:
     """The seconds to wait before refreshing the RPC."""
     client_id: int
     """The client ID of the Discord application."""
+    event_loop: str
+    """The event loop to use (either `default` or `uvloop`)."""
+    snapshot: bool
+    """Whether to export game state snapshots into the shared memory file."""
 
     editor: EditorConfig
     """The configuration of the RPC for when the user is in the editor."""
@@ -247,6 +436,42 @@ class Config:
     mode: ModeConfig
     """The configuration to use for level play mode display."""
 
+    override: OverrideConfig = field(factory=OverrideConfig)
+    """The configuration overrides to use for specific levels."""
+
+    level_key: Optional[LevelKey] = field(default=None, init=False, repr=False, eq=False)
+    level_config: Optional[LevelConfig] = field(default=None, init=False, repr=False, eq=False)
+
+    def get_level(
+        self, level_id: int, creator_name: str, difficulty: Difficulty, level_type: LevelType
+    ) -> LevelConfig:
+        """Resolves the level configuration to use for the given level,
+        applying the matching [`overrides`][gd.rpc.config.Config.override].
+
+        The configuration resolved for the current level is cached,
+        so that overrides are applied once per level session.
+
+        Arguments:
+            level_id: The ID of the level.
+            creator_name: The name of the level creator.
+            difficulty: The difficulty of the level.
+            level_type: The type of the level.
+
+        Returns:
+            The resolved level configuration.
+        """
+        key = (level_id, creator_name, difficulty, level_type)
+
+        level = self.level_config
+
+        if level is None or key != self.level_key:
+            level = self.override.apply(self.level, level_id, creator_name, difficulty, level_type)
+
+            self.level_key = key
+            self.level_config = level
+
+        return level
+
     # dynamic code ahead...
 
     @classmethod
@@ -297,6 +522,8 @@ class Config:
         process_name = rpc_data.process_name.unwrap_or(default_config.process_name)
         refresh_seconds = rpc_data.refresh_seconds.unwrap_or(default_config.refresh_seconds)
         client_id = rpc_data.client_id.unwrap_or(default_config.client_id)
+        event_loop = rpc_data.event_loop.unwrap_or(default_config.event_loop)
+        snapshot = rpc_data.snapshot.unwrap_or(default_config.snapshot)
 
         editor_data = rpc_data.editor.unwrap_or_else(AnyConfigData)
         editor_config = default_config.editor
@@ -370,16 +597,23 @@ class Config:
             practice=mode_data.practice.unwrap_or(mode_config.practice),
         )
 
+        override_data = rpc_data.override.unwrap_or_else(AnyConfigData)
+
+        override = OverrideConfig.from_data(override_data)
+
         return cls(
             process_name=process_name,
             refresh_seconds=refresh_seconds,
             client_id=client_id,
+            event_loop=event_loop,
+            snapshot=snapshot,
             editor=editor,
             level=level,
             scene=scene,
             difficulty=difficulty,
             level_type=level_type,
             mode=mode,
+            override=override,
         )
 
     @classmethod
@@ -399,6 +633,8 @@ class Config:
         process_name = rpc_data.process_name.expect(EXPECTED_RPC_PROCESS_NAME)
         refresh_seconds = rpc_data.refresh_seconds.expect(EXPECTED_RPC_REFRESH_SECONDS)
         client_id = rpc_data.client_id.expect(EXPECTED_RPC_CLIENT_ID)
+        event_loop = rpc_data.event_loop.expect(EXPECTED_RPC_EVENT_LOOP)
+        snapshot = rpc_data.snapshot.expect(EXPECTED_RPC_SNAPSHOT)
 
         editor_data = rpc_data.editor.expect(EXPECTED_RPC_EDITOR)
 
@@ -468,16 +704,23 @@ class Config:
             practice=mode_data.practice.expect(EXPECTED_RPC_MODE_PRACTICE),
         )
 
+        override_data = rpc_data.override.unwrap_or_else(AnyConfigData)  # optional
+
+        override = OverrideConfig.from_data(override_data)
+
         return cls(
             process_name=process_name,
             refresh_seconds=refresh_seconds,
             client_id=client_id,
+            event_loop=event_loop,
+            snapshot=snapshot,
             editor=editor,
             level=level,
             scene=scene,
             difficulty=difficulty,
             level_type=level_type,
             mode=mode,
+            override=override,
         )
 
 
@@ -0,0 +1,66 @@
+from pathlib import Path
+from sys import platform
+from typing import Optional
+
+from attrs import define, field
+from pypresence.utils import get_ipc_path  # type: ignore
+
+__all__ = ("DiscordWatcher", "find_ipc_path")
+
+WINDOWS = "win32"
+
+
+def find_ipc_path() -> Optional[Path]:
+    """Finds the path to the Discord IPC socket (or pipe), if any.
+
+    This uses the lookup done by [`pypresence`](https://github.com/qwertyquerty/pypresence)
+    itself, so that the socket is always searched for where connecting looks for it.
+
+    Returns:
+        The path to the IPC socket, or [`None`][None] if Discord is not running.
+    """
+    try:
+        path = get_ipc_path()  # type: ignore
+
+    except OSError:  # the socket exists, but does not accept connections
+        return None
+
+    if path is None:
+        return None
+
+    return Path(path)
+
+
+@define()
+class DiscordWatcher:
+    """Watches for the Discord IPC socket (or pipe) to appear or disappear.
+
+    Once found, the socket is checked with a single `stat` call per poll,
+    falling back to the full lookup only when it disappears.
+
+    On Windows, named pipes are not checked once found, since doing so can open them
+    (and fails while they are busy); instead, the watcher is
+    [`reset`][gd.rpc.discord.DiscordWatcher.reset] when the connection is lost.
+    """
+
+    path: Optional[Path] = field(default=None, init=False)
+    """The path to the last found IPC socket, if any."""
+
+    def is_available(self) -> bool:
+        """Checks whether any Discord client is available.
+
+        Returns:
+            Whether the Discord IPC socket exists.
+        """
+        path = self.path
+
+        if path is not None and (platform == WINDOWS or path.exists()):
+            return True
+
+        self.path = path = find_ipc_path()
+
+        return path is not None
+
+    def reset(self) -> None:
+        """Forgets the last found IPC socket, so that it is looked up again on the next poll."""
+        self.path = None
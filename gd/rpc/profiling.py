@@ -0,0 +1,120 @@
+from asyncio import sleep
+from cProfile import Profile
+from pathlib import Path
+from typing import Any, Optional
+
+from attrs import define, field
+from gd.tasks import ExponentialBackoff
+from typing_aliases import IntoPath, StringDict
+
+from gd.rpc.discord import DiscordWatcher
+from gd.rpc.runtime import ERROR_TYPES, RichPresenceRuntime
+from gd.rpc.timer import StageTimer
+
+__all__ = ("DEFAULT_PROFILE_PATH", "FakeDiscordWatcher", "FakePresence", "profile")
+
+DEFAULT_PROFILE_NAME = "gd.rpc.pstats"
+
+DEFAULT_PROFILE_PATH = Path(DEFAULT_PROFILE_NAME)
+
+DEFAULT_CLIENT_ID = "0"
+
+
+@define()
+class FakePresence:
+    """Represents the fake presence that does not connect to Discord, used for dry runs.
+
+    Implements the subset of the [`pypresence`](https://github.com/qwertyquerty/pypresence)
+    interface that is used by [`RichPresenceRuntime`][gd.rpc.runtime.RichPresenceRuntime].
+    """
+
+    client_id: str = field(default=DEFAULT_CLIENT_ID)
+    """The client ID of the Discord application."""
+
+    activity: Optional[StringDict[Any]] = field(default=None)
+    """The last activity set."""
+
+    sock_writer: None = field(default=None, init=False)
+
+    async def connect(self) -> None:
+        pass
+
+    async def update(self, **activity: Any) -> None:
+        self.activity = activity
+
+    async def clear(self, pid: Optional[int] = None) -> None:
+        self.activity = None
+
+    def send_data(self, op: int, payload: StringDict[Any]) -> None:
+        pass
+
+
+@define()
+class FakeDiscordWatcher(DiscordWatcher):
+    """Represents the Discord watcher that always reports Discord as available,
+    used for dry runs.
+    """
+
+    def is_available(self) -> bool:
+        return True
+
+
+async def profile(
+    runtime: RichPresenceRuntime, ticks: int, path: IntoPath = DEFAULT_PROFILE_PATH
+) -> StageTimer:
+    """Runs `ticks` updates of the `runtime` under [`cProfile`][cProfile],
+    dumping the statistics to `path`.
+
+    The statistics can be loaded with [`pstats`][pstats] or converted into other formats,
+    for instance, `speedscope` ones.
+
+    Updates failing with recoverable errors are retried with exponential backoff,
+    just like when running; the statistics collected so far are dumped even if profiling
+    is interrupted.
+
+    Arguments:
+        runtime: The runtime to profile (it should not be running).
+        ticks: The number of updates to profile.
+        path: The path to dump the statistics to.
+
+    Returns:
+        The timer that measured the stages of the updates.
+    """
+    timer = runtime.timer
+
+    if timer is None:
+        runtime.timer = timer = StageTimer()
+
+    runtime.ensure_presence()
+
+    profiler = Profile()
+
+    backoff = ExponentialBackoff()
+
+    delay: float = 0.0
+
+    try:
+        for index in range(ticks):
+            if index:
+                await sleep(delay)
+
+            timer.tick()
+
+            profiler.enable()
+
+            try:
+                await runtime.update()
+
+            except ERROR_TYPES:
+                delay = backoff.delay()
+
+            else:
+                delay = runtime.config.refresh_seconds
+
+            finally:
+                profiler.disable()
+
+    finally:
+        profiler.dump_stats(Path(path))
+
+    return timer
@@ -0,0 +1,686 @@
+from asyncio import AbstractEventLoop, CancelledError, Task, TimeoutError, get_running_loop
+from asyncio import new_event_loop as new_default_event_loop
+from asyncio import sleep
+from functools import lru_cache
+from pathlib import Path
+from time import time
+from types import TracebackType
+from typing import Any, Dict, Mapping, Optional, Type, TypeVar
+
+from aiohttp import ClientError
+from attrs import define, field
+from gd.enums import Difficulty
+from gd.errors import GDError
+from gd.level import Level
+from gd.memory.state import State, get_state
+from gd.string_utils import case_fold
+from gd.tasks import ExponentialBackoff
+from pypresence import AioPresence as AsyncPresence  # type: ignore  # no stubs or types
+from pypresence import PyPresenceException  # type: ignore
+from toml import TomlDecodeError as TOMLDecodeError
+
+from gd.rpc.config import PATH, Config, get_config
+from gd.rpc.discord import DiscordWatcher
+from gd.rpc.snapshot import Snapshot, SnapshotMode, SnapshotWriter
+from gd.rpc.template import Template
+from gd.rpc.timer import CONFIG, CONNECT, EXPORT, FORMAT, IPC, READ, RELOAD, StageTimer
+
+__all__ = ("DEFAULT_EVENT_LOOP", "UVLOOP", "RichPresenceRuntime", "new_event_loop")
+
+ICON = "icon"  # do not change
+
+DEFAULT = "default"
+DEFAULT_NAME = "unknown"
+
+DEFAULT_FEATURED = False
+DEFAULT_EPIC = False
+
+FEATURED = "featured"
+EPIC = "epic"
+
+DASH = "-"
+UNDER = "_"
+
+EMPTY = ""
+
+DEFAULT_EVENT_LOOP = DEFAULT
+UVLOOP = "uvloop"
+
+
+def new_event_loop(event_loop: str = DEFAULT_EVENT_LOOP) -> AbstractEventLoop:
+    """Creates a new event loop of the given kind.
+
+    Falls back to the default event loop if [`uvloop`](https://github.com/MagicStack/uvloop)
+    is requested but can not be imported.
+
+    Arguments:
+        event_loop: The kind of the event loop to create (either `default` or `uvloop`).
+
+    Returns:
+        The newly created event loop.
+    """
+    if event_loop == UVLOOP:
+        try:
+            from uvloop import new_event_loop as new_uvloop_event_loop  # type: ignore
+
+        except ImportError:
+            pass
+
+        else:
+            return new_uvloop_event_loop()  # type: ignore
+
+    return new_default_event_loop()
+
+
+def get_timestamp() -> int:
+    """Returns the time in seconds since the epoch as an integer.
+
+    Returns:
+        The time in seconds since the epoch.
+    """
+    return int(time())
+
+
+def get_modified(path: Path) -> Optional[int]:
+    """Returns the last modification time of the file at `path` in nanoseconds.
+
+    Arguments:
+        path: The path to the file.
+
+    Returns:
+        The last modification time of the file, or [`None`][None] if it can not be accessed.
+    """
+    try:
+        return path.stat().st_mtime_ns
+
+    except OSError:
+        return None
+
+
+def get_memory_state(process_name: str) -> State:
+    if process_name == DEFAULT:
+        return get_state()
+
+    return get_state(process_name)
+
+
+@lru_cache()
+def get_image_name(
+    difficulty: Difficulty,
+    featured: bool = DEFAULT_FEATURED,
+    epic: bool = DEFAULT_EPIC,
+) -> str:
+    """Computes an image name based on `difficulty` and `featured` / `epic`.
+
+    Arguments:
+        difficulty: The related level difficulty to look up.
+        featured: Whether the related level is featured.
+        epic: Whether the related level is epic.
+
+    Returns:
+        The name of the image to use.
+    """
+    parts = case_fold(difficulty.name).split(UNDER)
+
+    if epic:
+        parts.append(EPIC)
+
+    elif featured:
+        parts.append(FEATURED)
+
+    return DASH.join(parts)
+
+
+CLOSE = 2
+
+
+def close_writer(presence: AsyncPresence) -> None:
+    # close the stream of the (possibly lost) connection, so that it does not leak
+    sock_writer = presence.sock_writer
+
+    if sock_writer is not None:
+        presence.sock_writer = None
+
+        sock_writer.close()
+
+
+def close_presence(presence: AsyncPresence) -> None:
+    # unlike `presence.close()`, this does not close the event loop
+    presence.send_data(CLOSE, dict(v=1, client_id=presence.client_id))
+
+    close_writer(presence)
+
+
+ERROR_TYPES = (OSError, GDError, ClientError, TimeoutError)  # same as `gd.tasks.Loop`
+
+CONNECTED = "connected to discord"
+WAITING = "waiting for discord..."
+SNAPSHOT_FAILED = "can not export snapshots: {}"
+
+R = TypeVar("R", bound="RichPresenceRuntime")
+
+
+@define()
+class RichPresenceRuntime:
+    """Represents the runtime of the RPC, which can be embedded into existing applications.
+
+    The runtime runs on the event loop it is started in, for instance:
+
+    ```python
+    async with RichPresenceRuntime() as runtime:
+        await runtime.wait()
+    ```
+    """
+
+    config: Config = field(factory=get_config)
+    """The configuration of the RPC."""
+
+    reload: bool = field(default=False)
+    """Whether to reload the configuration from the file when it changes.
+
+    This should only be enabled if the configuration was loaded from the file.
+    """
+
+    verbose: bool = field(default=False)
+    """Whether to print connection status changes."""
+
+    presence: Optional[Any] = field(default=None)
+    """The presence to use (either [`AioPresence`][pypresence.AioPresence] or compatible),
+    created on [`start`][gd.rpc.runtime.RichPresenceRuntime.start] if not provided.
+    """
+
+    discord_watcher: DiscordWatcher = field(factory=DiscordWatcher)
+    """The watcher used to check whether Discord is available."""
+
+    timer: Optional[StageTimer] = field(default=None)
+    """The timer to measure update stages with, if any."""
+
+    memory_state: State = field(init=False)
+
+    connected: bool = field(default=False, init=False)
+    start_timestamp: int = field(factory=get_timestamp, init=False)
+
+    config_modified: Optional[int] = field(default=None, init=False)
+
+    templates: Dict[str, Template] = field(factory=dict, init=False)
+
+    snapshot_writer: Optional[SnapshotWriter] = field(default=None, init=False)
+    snapshot_failed: bool = field(default=False, init=False)
+
+    task: "Optional[Task[None]]" = field(default=None, init=False)
+
+    def __attrs_post_init__(self) -> None:
+        self.memory_state = get_memory_state(self.config.process_name)
+
+        if self.reload:
+            self.config_modified = get_modified(PATH)
+
+    async def __aenter__(self: R) -> R:
+        await self.start()
+
+        return self
+
+    async def __aexit__(
+        self,
+        error_type: Optional[Type[BaseException]],
+        error: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        await self.stop()
+
+    def is_running(self) -> bool:
+        """Checks whether the runtime is running.
+
+        Returns:
+            Whether the runtime is running.
+        """
+        task = self.task
+
+        return task is not None and not task.done()
+
+    async def start(self) -> None:
+        """Starts the runtime in the running event loop.
+
+        Does nothing if the runtime is already running.
+        """
+        if self.is_running():
+            return
+
+        self.ensure_presence()
+
+        if not self.discord_watcher.is_available():
+            self.echo(WAITING)
+
+        self.task = get_running_loop().create_task(self.run())
+
+    def ensure_presence(self) -> None:
+        """Creates the presence bound to the running event loop, unless it already exists."""
+        if self.presence is None:
+            self.presence = AsyncPresence(str(self.config.client_id), loop=get_running_loop())
+
+    async def stop(self) -> None:
+        """Stops the runtime, clearing the presence and closing the connection to Discord.
+
+        Raises:
+            Exception: The error the runtime has failed with, unless already propagated
+                by [`wait`][gd.rpc.runtime.RichPresenceRuntime.wait].
+        """
+        error: Optional[BaseException] = None
+
+        task = self.task
+
+        if task is not None:
+            self.task = None
+
+            if task.done():
+                if not task.cancelled():
+                    error = task.exception()  # the runtime has failed while nobody was waiting
+
+            else:
+                task.cancel()
+
+                try:
+                    await task
+
+                except CancelledError:
+                    pass
+
+        presence = self.presence
+
+        if self.connected and presence is not None:
+            self.connected = False
+
+            try:
+                await presence.clear()
+
+                close_presence(presence)
+
+            except (PyPresenceException, OSError):  # connection is already lost
+                pass
+
+        snapshot_writer = self.snapshot_writer
+
+        if snapshot_writer is not None:
+            self.snapshot_writer = None
+
+            snapshot_writer.clear()
+            snapshot_writer.close()
+
+        if error is not None:
+            raise error
+
+    async def wait(self) -> None:
+        """Waits for the runtime to stop, propagating any errors that occurred."""
+        task = self.task
+
+        if task is not None:
+            try:
+                await task
+
+            finally:
+                if task.done():  # the outcome is propagated here, so forget about the task
+                    self.task = None
+
+    async def run(self) -> None:
+        """Runs the update loop of the runtime until cancelled.
+
+        Updates failing with recoverable errors are retried with exponential backoff.
+        """
+        backoff = ExponentialBackoff()
+
+        while True:
+            try:
+                await self.update()
+
+            except ERROR_TYPES:
+                await sleep(backoff.delay())
+
+            else:
+                await sleep(self.config.refresh_seconds)
+
+    def reload_config(self) -> None:
+        """Reloads the configuration if reloading is enabled and the config file has changed."""
+        if not self.reload:
+            return
+
+        modified = get_modified(PATH)
+
+        if modified != self.config_modified:  # only reload (and recompile) if it changed
+            self.config_modified = modified
+
+            try:
+                self.config = get_config()  # try to load the config
+
+            except (TOMLDecodeError, OSError):  # if config is invalid or can not be read
+                pass  # do nothing, keeping the old config
+
+            else:
+                self.templates.clear()  # drop templates that might not be used anymore
+
+                self.snapshot_failed = False  # try to open the snapshot file again
+
+    def render(self, string: str, format_map: Mapping[str, Any]) -> str:
+        """Renders the format `string` using `format_map`, compiling it into
+        the [`Template`][gd.rpc.template.Template] on first use.
+
+        Arguments:
+            string: The format string to render.
+            format_map: The mapping to format the string with.
+
+        Returns:
+            The rendered string.
+        """
+        templates = self.templates
+
+        template = templates.get(string)
+
+        if template is None:
+            template = templates[string] = Template(string)
+
+        return template.render(format_map)
+
+    def disconnect(self) -> None:
+        """Drops the connection to Discord, closing its stream."""
+        self.connected = False
+
+        self.discord_watcher.reset()  # look for the socket again
+
+        presence = self.presence
+
+        if presence is not None:
+            close_writer(presence)
+
+    def echo(self, message: str) -> None:
+        if self.verbose:
+            print(message)
+
+    def get_snapshot_writer(self) -> Optional[SnapshotWriter]:
+        """Returns the snapshot writer if exporting snapshots is enabled,
+        opening or closing the snapshot file as needed.
+
+        Failing to open the snapshot file is reported once, and opening it is not retried
+        until the configuration is reloaded.
+
+        Returns:
+            The snapshot writer, if exporting snapshots is enabled.
+        """
+        snapshot_writer = self.snapshot_writer
+
+        if self.config.snapshot:
+            if snapshot_writer is None and not self.snapshot_failed:
+                try:
+                    self.snapshot_writer = snapshot_writer = SnapshotWriter.open()
+
+                except OSError as error:  # can not open the snapshot file
+                    self.snapshot_failed = True
+
+                    self.echo(SNAPSHOT_FAILED.format(error))
+
+        elif snapshot_writer is not None:
+            self.snapshot_writer = None
+
+            snapshot_writer.clear()  # make sure readers do not see stale state
+            snapshot_writer.close()
+
+            return None
+
+        return snapshot_writer
+
+    def lap(self, stage: str) -> None:
+        timer = self.timer
+
+        if timer is not None:
+            timer.lap(stage)
+
+    async def update(self) -> None:
+        """Updates the presence once, based on the current state of the game."""
+        presence = self.presence
+
+        if presence is None:  # not started
+            return
+
+        if not self.discord_watcher.is_available():  # no discord client is listening
+            if self.connected:
+                self.disconnect()
+
+                self.echo(WAITING)
+
+        elif not self.connected:
+            try:
+                await presence.connect()
+
+            except (PyPresenceException, OSError):  # discord is not ready yet
+                close_writer(presence)  # the handshake might have failed after connecting
+
+                self.discord_watcher.reset()  # the socket found might be stale
+
+            else:
+                self.connected = True
+
+                self.start_timestamp = get_timestamp()  # start fresh
+
+                self.echo(CONNECTED)
+
+        self.lap(CONNECT)
+
+        if not self.connected and not self.config.snapshot:  # nothing is listening
+            return  # suspend polling the game entirely
+
+        try:
+            self.memory_state.reload()  # attempt to reload the state
+
+        except LookupError:  # can not find the process
+            self.lap(RELOAD)
+
+            self.start_timestamp = get_timestamp()  # restart the time
+
+            snapshot_writer = self.get_snapshot_writer()
+
+            if snapshot_writer is not None:
+                snapshot_writer.clear()
+
+            if self.connected:
+                try:
+                    await presence.clear()  # clear presence state
+
+                except (PyPresenceException, OSError):  # lost connection to discord
+                    self.disconnect()
+
+            return
+
+        self.lap(RELOAD)
+
+        self.reload_config()
+
+        self.lap(CONFIG)
+
+        config = self.config
+
+        # annotations for mypy
+        details: Optional[str]
+        state: Optional[str]
+
+        account_manager_pointer = self.memory_state.account_manager
+
+        if account_manager_pointer.is_null():
+            name = DEFAULT_NAME
+
+        else:
+            account_manager = account_manager_pointer.value
+
+            name = account_manager.name  # get the name
+
+            if not name:  # set default if not found
+                name = DEFAULT_NAME
+
+        game_manager_pointer = self.memory_state.game_manager
+
+        if game_manager_pointer.is_null():
+            snapshot_writer = self.get_snapshot_writer()
+
+            if snapshot_writer is not None:
+                snapshot_writer.clear()
+
+            return
+
+        game_manager = game_manager_pointer.value
+
+        scene = game_manager.scene
+
+        editor_layer_pointer = game_manager.editor_layer
+        play_layer_pointer = game_manager.play_layer
+
+        if play_layer_pointer.is_null():  # if not playing any levels
+            snapshot_mode = SnapshotMode.NONE
+
+            level_id = 0
+            progress = 0.0
+            attempt = 0
+
+            if editor_layer_pointer.is_null():
+                self.lap(READ)
+
+                details = config.scene.get(scene)
+                state = None
+
+            else:
+                editor_layer = editor_layer_pointer.value
+
+                level_settings = editor_layer.level_settings.value
+                level = level_settings.level.value
+
+                object_count = editor_layer.object_count
+                level_name = level.name
+
+                self.lap(READ)
+
+                format_map = dict(
+                    object_count=object_count,
+                    level_name=level_name,
+                    name=name,
+                )
+
+                details = self.render(config.editor.details, format_map)
+                state = self.render(config.editor.state, format_map)
+
+            small_image = None
+            small_text = None
+
+        else:  # if playing some level
+            play_layer = play_layer_pointer.value
+
+            attempt = play_layer.attempt
+
+            level_settings = play_layer.level_settings.value
+
+            level = level_settings.level.value
+
+            normal_record = level.normal_record
+            practice_record = level.practice_record
+
+            if play_layer.is_practice():
+                snapshot_mode = SnapshotMode.PRACTICE
+
+                mode = config.mode.practice
+
+            else:
+                snapshot_mode = SnapshotMode.NORMAL
+
+                mode = config.mode.normal
+
+            level_id = level.level_id
+            level_name = level.name
+            level_creator_name = level.creator_name
+            level_difficulty = level.difficulty
+            level_attempts = level.attempts
+            level_stars = level.stars
+            level_type = level.type
+
+            featured = level.is_featured()
+            epic = level.is_epic()
+
+            if level_type.is_official():
+                level_model = Level.official(level_id)
+
+                level_difficulty = level_model.difficulty
+                level_creator_name = level_model.creator.name
+                featured = level_model.is_featured()
+                epic = level_model.is_epic()
+
+            if level_type.is_created():
+                level_difficulty = Difficulty.UNKNOWN
+                level_creator_name = name
+
+            raw_progress = play_layer.progress
+
+            self.lap(READ)
+
+            # resolve the level configuration, applying any matching overrides
+            level_config = config.get_level(
+                level_id, level_creator_name, level_difficulty, level_type
+            )
+
+            self.lap(CONFIG)
+
+            progress = round(raw_progress, level_config.progress_precision)
+
+            format_map = dict(
+                name=name,
+                progress=progress,
+                attempt=attempt,
+                mode=mode,
+                level_normal_record=normal_record,
+                level_practice_record=practice_record,
+                level_type=config.level_type.get(level_type),
+                level_id=level_id,
+                level_name=level_name,
+                level_creator_name=level_creator_name,
+                level_difficulty=config.difficulty.get(level_difficulty),
+                level_attempts=level_attempts,
+                level_stars=level_stars,
+            )
+
+            details = self.render(level_config.details, format_map)
+            state = self.render(level_config.state, format_map)
+
+            small_image = get_image_name(level_difficulty, featured, epic)
+            small_text = self.render(level_config.small, format_map)
+
+        self.lap(FORMAT)
+
+        snapshot_writer = self.get_snapshot_writer()
+
+        if snapshot_writer is not None:
+            snapshot = Snapshot(
+                scene=scene.value,
+                mode=snapshot_mode,
+                level_id=level_id,
+                progress=progress,
+                attempt=attempt,
+                details=details or EMPTY,
+                state=state or EMPTY,
+            )
+
+            snapshot_writer.write(snapshot)
+
+        self.lap(EXPORT)
+
+        if not self.connected:
+            return
+
+        try:
+            await presence.update(
+                pid=self.memory_state.process_id,
+                state=state,
+                details=details,
+                start=self.start_timestamp,
+                large_image=ICON,
+                large_text=name,
+                small_image=small_image,
+                small_text=small_text,
+            )
+
+        except (PyPresenceException, OSError):  # lost connection to discord
+            self.disconnect()
+
+        self.lap(IPC)
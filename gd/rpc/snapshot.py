@@ -0,0 +1,455 @@
+"""Shared-memory snapshots of the game state, for local overlays.
+
+The latest snapshot is published into the fixed-layout memory-mapped file,
+guarded by the *sequence lock*: the writer makes the sequence number odd
+before writing and even after, while readers retry (a bounded number of times)
+until they observe the same even sequence number before and after reading.
+
+Readers only need [`mmap`][mmap] and [`struct`][struct]:
+
+```python
+from gd.rpc.snapshot import SnapshotReader
+
+with SnapshotReader.open() as reader:
+    snapshot = reader.read()
+```
+
+Note that Python does not expose memory fences, so the ordering of writes
+as observed by readers is up to the platform (it is preserved on x86).
+"""
+
+import os
+import sys
+from enum import IntEnum
+from getpass import getuser
+from mmap import ACCESS_READ, ACCESS_WRITE, mmap
+from os import O_CREAT, O_RDWR, SEEK_SET, environ, fdopen, fstat, lseek
+from pathlib import Path
+from stat import S_ISDIR, S_ISREG, S_IWGRP, S_IWOTH
+from struct import Struct
+from tempfile import gettempdir
+from time import sleep
+from types import TracebackType
+from typing import BinaryIO, Optional, Type, TypeVar
+
+from attrs import define, field
+from typing_aliases import IntoPath
+
+if sys.platform == "win32":
+    from msvcrt import LK_NBLCK, locking
+
+else:
+    from fcntl import LOCK_EX, LOCK_NB, flock
+
+__all__ = (
+    "SNAPSHOT_PATH",
+    "Snapshot",
+    "SnapshotMode",
+    "SnapshotReader",
+    "SnapshotWriter",
+    "get_snapshot_path",
+)
+
+XDG_RUNTIME_DIR = "XDG_RUNTIME_DIR"
+
+DIRECTORY_NAME = "gd.rpc-{}"
+SNAPSHOT_NAME = "gd.rpc.snapshot"
+
+DEFAULT_USER = "default"
+
+DIRECTORY_MODE = 0o700
+FILE_MODE = 0o600
+
+O_BINARY = getattr(os, "O_BINARY", 0)  # windows only
+O_NOFOLLOW = getattr(os, "O_NOFOLLOW", 0)  # not on windows
+
+FLAGS = O_RDWR | O_CREAT | O_NOFOLLOW | O_BINARY
+
+UNSAFE_DIRECTORY = "refusing to use `{}`, which is not the private directory of the current user"
+INCOMPLETE_FILE = "the snapshot file `{}` is not initialized yet"
+LOCKED_FILE = "the snapshot file `{}` is already used by another writer"
+UNSAFE_FILE = "refusing to use `{}`, which is not the regular file owned by the current user"
+
+
+def get_user() -> str:
+    try:
+        return getuser()
+
+    except (ImportError, KeyError, OSError):  # can not determine the user
+        return DEFAULT_USER
+
+
+def get_snapshot_path() -> Path:
+    """Returns the default path of the snapshot file.
+
+    The file is placed into the per-user directory within `$XDG_RUNTIME_DIR` if set,
+    and the temporary directory otherwise.
+
+    Returns:
+        The default path of the snapshot file.
+    """
+    directory = environ.get(XDG_RUNTIME_DIR) or gettempdir()
+
+    return Path(directory) / DIRECTORY_NAME.format(get_user()) / SNAPSHOT_NAME
+
+
+def is_owned(status: os.stat_result) -> bool:
+    if sys.platform == "win32":  # ownership is not reported on windows
+        return True
+
+    return status.st_uid == os.getuid()
+
+
+def check_directory(directory: Path) -> None:
+    status = directory.lstat()  # do not follow symbolic links
+
+    if (
+        not S_ISDIR(status.st_mode)
+        or not is_owned(status)
+        or (sys.platform != "win32" and status.st_mode & (S_IWGRP | S_IWOTH))
+    ):
+        raise PermissionError(UNSAFE_DIRECTORY.format(directory.as_posix()))
+
+
+def lock_file(descriptor: int, path: Path) -> None:
+    try:
+        if sys.platform == "win32":
+            # lock the byte past the end, so that reading the snapshot is not blocked
+            lseek(descriptor, SIZE, SEEK_SET)
+
+            locking(descriptor, LK_NBLCK, 1)
+
+        else:
+            flock(descriptor, LOCK_EX | LOCK_NB)
+
+    except OSError as error:
+        raise OSError(LOCKED_FILE.format(path.as_posix())) from error
+
+
+def open_file(path: Path) -> BinaryIO:
+    directory = path.parent
+
+    directory.mkdir(mode=DIRECTORY_MODE, parents=True, exist_ok=True)
+
+    check_directory(directory)
+
+    descriptor = os.open(path, FLAGS, FILE_MODE)  # fails on symbolic links
+
+    try:
+        status = fstat(descriptor)
+
+        if not S_ISREG(status.st_mode) or not is_owned(status):
+            raise PermissionError(UNSAFE_FILE.format(path.as_posix()))
+
+        lock_file(descriptor, path)  # released when the file is closed
+
+        return fdopen(descriptor, "r+b")
+
+    except BaseException:
+        os.close(descriptor)
+
+        raise
+
+
+SNAPSHOT_PATH = get_snapshot_path()
+
+MAGIC = b"GDRP"
+VERSION = 1
+
+TEXT_SIZE = 512  # bytes; enough for 128 characters that the presence allows
+
+HEADER = Struct("<4sHxxQ")  # magic, version, (padding), sequence
+SEQUENCE = Struct("<Q")
+SEQUENCE_OFFSET = 8
+
+# scene, mode, level ID, progress, attempt, details length, state length, details, state
+BODY = Struct(f"<iIqdIHH{TEXT_SIZE}s{TEXT_SIZE}s")
+BODY_OFFSET = HEADER.size
+
+SIZE = HEADER.size + BODY.size
+
+NO_SCENE = -1
+
+READ_ATTEMPTS = 100
+READ_DELAY = 0.001  # seconds
+
+ENCODING = "utf-8"
+ERRORS = "ignore"
+
+
+class SnapshotMode(IntEnum):
+    """Represents level play modes in snapshots."""
+
+    NONE = 0
+    NORMAL = 1
+    PRACTICE = 2
+
+
+@define()
+class Snapshot:
+    """Represents snapshots of the game state."""
+
+    scene: int = field(default=NO_SCENE)
+    """The value of the current scene, or `-1` if the game is not running."""
+    mode: SnapshotMode = field(default=SnapshotMode.NONE)
+    """The current play mode, if playing any level."""
+    level_id: int = field(default=0)
+    """The ID of the current level, if any."""
+    progress: float = field(default=0.0)
+    """The current progress, if playing any level."""
+    attempt: int = field(default=0)
+    """The current attempt, if playing any level."""
+    details: str = field(default="")
+    """The rendered `details` of the presence."""
+    state: str = field(default="")
+    """The rendered `state` of the presence."""
+
+    def is_running(self) -> bool:
+        """Checks whether the game is running.
+
+        Returns:
+            Whether the game is running.
+        """
+        return self.scene != NO_SCENE
+
+
+def encode_text(text: str) -> bytes:
+    # truncate to fit, without leaving incomplete characters behind
+    return text.encode(ENCODING)[:TEXT_SIZE].decode(ENCODING, ERRORS).encode(ENCODING)
+
+
+def decode_text(data: bytes, length: int) -> str:
+    return data[:length].decode(ENCODING, ERRORS)
+
+
+W = TypeVar("W", bound="SnapshotWriter")
+
+
+@define()
+class SnapshotWriter:
+    """Publishes snapshots into the memory-mapped file."""
+
+    file: BinaryIO = field()
+    memory: mmap = field()
+
+    sequence: int = field(default=0, init=False)
+
+    @classmethod
+    def open(cls: Type[W], path: IntoPath = SNAPSHOT_PATH) -> W:
+        """Opens (creating, if needed) the snapshot file at `path` for writing.
+
+        The parent directory is created private to the current user, and both the directory
+        and the file are checked to belong to the current user before anything is written.
+        The file is locked for as long as the writer is open, so that only one writer
+        can publish snapshots into it at once.
+
+        Arguments:
+            path: The path to the snapshot file.
+
+        Raises:
+            OSError: The file can not be opened or mapped, or is used by another writer.
+            PermissionError: The directory or the file is not safe to use.
+
+        Returns:
+            The newly created [`SnapshotWriter`][gd.rpc.snapshot.SnapshotWriter].
+        """
+        file = open_file(Path(path))
+
+        try:
+            file.truncate(SIZE)
+
+            memory = mmap(file.fileno(), SIZE, access=ACCESS_WRITE)
+
+        except BaseException:
+            file.close()
+
+            raise
+
+        writer = cls(file, memory)
+
+        magic, version, sequence = HEADER.unpack_from(memory)
+
+        if magic == MAGIC and version == VERSION:
+            # continue the sequence, so that readers never mistake new data for old
+            writer.sequence = sequence + sequence % 2
+
+        else:
+            HEADER.pack_into(memory, 0, MAGIC, VERSION, writer.sequence)
+
+        writer.clear()
+
+        return writer
+
+    def write(self, snapshot: Snapshot) -> None:
+        """Publishes the `snapshot`.
+
+        Arguments:
+            snapshot: The snapshot to publish.
+        """
+        memory = self.memory
+
+        details = encode_text(snapshot.details)
+        state = encode_text(snapshot.state)
+
+        sequence = self.sequence + 1  # odd: writing
+
+        SEQUENCE.pack_into(memory, SEQUENCE_OFFSET, sequence)
+
+        BODY.pack_into(
+            memory,
+            BODY_OFFSET,
+            snapshot.scene,
+            snapshot.mode,
+            snapshot.level_id,
+            snapshot.progress,
+            snapshot.attempt,
+            len(details),
+            len(state),
+            details,
+            state,
+        )
+
+        sequence += 1  # even: written
+
+        SEQUENCE.pack_into(memory, SEQUENCE_OFFSET, sequence)
+
+        self.sequence = sequence
+
+    def clear(self) -> None:
+        """Publishes the empty snapshot, meaning that the game is not running."""
+        self.write(Snapshot())
+
+    def close(self) -> None:
+        """Closes the snapshot file."""
+        self.memory.close()
+        self.file.close()
+
+    def __enter__(self: W) -> W:
+        return self
+
+    def __exit__(
+        self,
+        error_type: Optional[Type[BaseException]],
+        error: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+R = TypeVar("R", bound="SnapshotReader")
+
+
+@define()
+class SnapshotReader:
+    """Reads snapshots from the memory-mapped file."""
+
+    file: BinaryIO = field()
+    memory: mmap = field()
+    view: memoryview = field()
+
+    @classmethod
+    def open(cls: Type[R], path: IntoPath = SNAPSHOT_PATH) -> R:
+        """Opens the snapshot file at `path` for reading.
+
+        Arguments:
+            path: The path to the snapshot file.
+
+        Raises:
+            OSError: The file does not exist, is not initialized yet or can not be mapped.
+
+        Returns:
+            The newly created [`SnapshotReader`][gd.rpc.snapshot.SnapshotReader].
+        """
+        path = Path(path)
+
+        file = path.open("rb")
+
+        try:
+            if fstat(file.fileno()).st_size < SIZE:  # the writer has not truncated the file yet
+                raise OSError(INCOMPLETE_FILE.format(path.as_posix()))
+
+            memory = mmap(file.fileno(), SIZE, access=ACCESS_READ)
+
+        except BaseException:
+            file.close()
+
+            raise
+
+        return cls(file, memory, memoryview(memory))
+
+    def read_sequence(self) -> int:
+        (sequence,) = SEQUENCE.unpack_from(self.view, SEQUENCE_OFFSET)
+
+        return sequence  # type: ignore
+
+    def read(self) -> Optional[Snapshot]:
+        """Reads the latest consistent snapshot.
+
+        The read is retried (backing off for a bit) while the writer is writing,
+        up to a fixed number of attempts.
+
+        Returns:
+            The latest snapshot, or [`None`][None] if nothing was published yet
+            or no consistent snapshot could be read.
+        """
+        view = self.view
+
+        magic, version, _ = HEADER.unpack_from(view)
+
+        if magic != MAGIC or version != VERSION:
+            return None
+
+        for _ in range(READ_ATTEMPTS):
+            sequence = self.read_sequence()
+
+            if sequence % 2:  # the writer is writing
+                sleep(READ_DELAY)
+
+                continue
+
+            (
+                scene,
+                mode,
+                level_id,
+                progress,
+                attempt,
+                details_length,
+                state_length,
+                details,
+                state,
+            ) = BODY.unpack_from(view, BODY_OFFSET)
+
+            if self.read_sequence() == sequence:  # nothing changed while reading
+                break
+
+            sleep(READ_DELAY)
+
+        else:  # the writer kept writing
+            return None
+
+        return Snapshot(
+            scene=scene,
+            mode=SnapshotMode(mode),
+            level_id=level_id,
+            progress=progress,
+            attempt=attempt,
+            details=decode_text(details, details_length),
+            state=decode_text(state, state_length),
+        )
+
+    def close(self) -> None:
+        """Closes the snapshot file."""
+        self.view.release()
+        self.memory.close()
+        self.file.close()
+
+    def __enter__(self: R) -> R:
+        return self
+
+    def __exit__(
+        self,
+        error_type: Optional[Type[BaseException]],
+        error: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
@@ -0,0 +1,114 @@
+from string import Formatter
+from typing import Any, Iterator, Mapping, Optional, Tuple
+
+from attrs import define, field
+
+__all__ = ("Template", "get_fields", "is_expensive")
+
+DOT = "."
+LEFT_BRACKET = "["
+
+formatter = Formatter()
+
+
+def get_field_name(field_name: str) -> str:
+    # `{level.name}` and `{levels[0]}` both depend on the top-level name only
+    for delimiter in (DOT, LEFT_BRACKET):
+        field_name, _, _ = field_name.partition(delimiter)
+
+    return field_name
+
+
+def get_fields(string: str) -> Iterator[str]:
+    """Yields the names of the fields referenced by the format `string`,
+    including the ones in nested format specifications.
+
+    Arguments:
+        string: The format string to parse.
+
+    Returns:
+        The iterator over field names.
+    """
+    for _, field_name, format_spec, _ in formatter.parse(string):
+        if field_name is None:
+            continue
+
+        yield get_field_name(field_name)
+
+        if format_spec:
+            yield from get_fields(format_spec)
+
+
+def is_expensive(string: str) -> bool:
+    """Checks whether formatting `string` is expensive enough to be worth caching,
+    that is, whether any of its fields use attribute or item access, conversions
+    or format specifications.
+
+    Arguments:
+        string: The format string to check.
+
+    Returns:
+        Whether formatting `string` is expensive.
+    """
+    for _, field_name, format_spec, conversion in formatter.parse(string):
+        if field_name is None:
+            continue
+
+        if conversion or format_spec or get_field_name(field_name) != field_name:
+            return True
+
+    return False
+
+
+@define()
+class Template:
+    """Represents compiled format strings that track the fields they depend on.
+
+    Rendering of [expensive][gd.rpc.template.is_expensive] templates is incremental:
+    the last output is reused as long as the values (and types) of the referenced fields
+    do not change. Other templates are simply formatted, since that is cheaper than comparing.
+    """
+
+    string: str = field()
+    """The format string."""
+
+    fields: Tuple[str, ...] = field(init=False)
+    """The names of the fields referenced by the format string."""
+
+    cached: bool = field(init=False)
+    """Whether the output is cached between renders."""
+
+    inputs: Optional[Tuple[Any, ...]] = field(default=None, init=False, repr=False, eq=False)
+    output: Optional[str] = field(default=None, init=False, repr=False, eq=False)
+
+    def __attrs_post_init__(self) -> None:
+        string = self.string
+
+        self.fields = tuple(dict.fromkeys(get_fields(string)))  # unique, ordered
+        self.cached = is_expensive(string)
+
+    def render(self, format_map: Mapping[str, Any]) -> str:
+        """Renders the template using `format_map`, reusing the last output
+        if the template is cached and the referenced values have not changed.
+
+        Arguments:
+            format_map: The mapping to format the string with.
+
+        Returns:
+            The rendered string.
+        """
+        if not self.cached:
+            return self.string.format_map(format_map)
+
+        # values can be equal while being formatted differently, for instance, `1` and `1.0`
+        inputs = tuple((type(value), value) for value in map(format_map.get, self.fields))
+
+        output = self.output
+
+        if output is None or inputs != self.inputs:
+            output = self.string.format_map(format_map)
+
+            self.inputs = inputs
+            self.output = output
+
+        return output
@@ -0,0 +1,84 @@
+from time import perf_counter
+from typing import Dict, List
+
+from attrs import define, field
+
+__all__ = ("CONFIG", "CONNECT", "EXPORT", "FORMAT", "IPC", "READ", "RELOAD", "STAGES", "StageTimer")
+
+CONNECT = "connect"
+RELOAD = "reload"
+CONFIG = "config"
+READ = "read"
+FORMAT = "format"
+EXPORT = "export"
+IPC = "ipc"
+
+STAGES = (CONNECT, RELOAD, CONFIG, READ, FORMAT, EXPORT, IPC)
+
+TICKS = "ticks: {}"
+HEADER = "{:<8} {:>12} {:>16}".format("stage", "total (ms)", "per tick (ms)")
+ROW = "{:<8} {:>12.3f} {:>16.3f}"
+
+MILLISECONDS = 1000
+
+
+@define()
+class StageTimer:
+    """Measures the time spent in each stage of presence updates.
+
+    Time is measured in laps: each call to [`lap`][gd.rpc.timer.StageTimer.lap]
+    attributes the time elapsed since the previous one to the given stage.
+    """
+
+    timings: Dict[str, List[float]] = field(factory=dict)
+    """The measured timings (in seconds) of each stage."""
+
+    ticks: int = field(default=0)
+    """The number of measured ticks."""
+
+    last: float = field(factory=perf_counter, init=False)
+
+    def tick(self) -> None:
+        """Starts measuring the next tick (update)."""
+        self.ticks += 1
+
+        self.last = perf_counter()
+
+    def lap(self, stage: str) -> None:
+        """Attributes the time elapsed since the previous lap to the `stage`.
+
+        Arguments:
+            stage: The stage to attribute the time to.
+        """
+        now = perf_counter()
+
+        self.timings.setdefault(stage, []).append(now - self.last)
+
+        self.last = now
+
+    def summary(self) -> str:
+        """Formats the summary of the measured timings.
+
+        Returns:
+            The summary table.
+        """
+        ticks = self.ticks
+
+        lines = [TICKS.format(ticks), HEADER]
+
+        if not ticks:
+            return "\n".join(lines)
+
+        timings = self.timings
+
+        for stage in STAGES:
+            stage_timings = timings.get(stage)
+
+            if not stage_timings:
+                continue
+
+            total = sum(stage_timings) * MILLISECONDS
+
+            lines.append(ROW.format(stage, total, total / ticks))
+
+        return "\n".join(lines)